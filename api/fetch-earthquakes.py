@@ -1,8 +1,20 @@
 from http.server import BaseHTTPRequestHandler
+import hashlib
 import json
+import os
+import re
 import sys
+import time
+import inspect
+import tempfile
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from stat import S_ISDIR
 
 # Try to import dateutil, fallback to basic parsing if not available
 try:
@@ -11,163 +23,403 @@ try:
 except ImportError:
     HAS_DATEUTIL = False
 
+# Try to import orjson for faster response encoding, fallback to json if not available
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 try:
     from pylindol import PhivolcsEarthquakeInfoScraper
     HAS_PYLINDOL = True
 except ImportError:
     HAS_PYLINDOL = False
 
-def parse_datetime(date_str, time_str=None):
-    """Parse date and time strings into ISO 8601 format."""
+SCRAPER_METHODS = ('run', 'fetch', 'scrape', 'get')
+
+def detect_run_mode():
+    """Return (mode, method name) describing how pylindol fetches a given month.
+    
+    mode is 'kwargs', 'positional', 'constructor' (month/year passed to the
+    constructor, as in newer pylindol) or None.
+    """
+    for name in SCRAPER_METHODS:
+        method = getattr(PhivolcsEarthquakeInfoScraper, name, None)
+        if not callable(method):
+            continue
+        params = list(inspect.signature(method).parameters)[1:]  # skip self
+        if 'month' in params and 'year' in params:
+            return 'kwargs', name
+        if name == 'run' and len(params) >= 2:
+            return 'positional', name
+    
+    params = list(inspect.signature(PhivolcsEarthquakeInfoScraper.__init__).parameters)[1:]
+    if 'month' in params and 'year' in params:
+        # fetch() returns the data without exporting a file
+        for name in ('fetch', 'run'):
+            if callable(getattr(PhivolcsEarthquakeInfoScraper, name, None)):
+                return 'constructor', name
+    return None, None
+
+# The scraper API doesn't change between months, so inspect it once
+RUN_MODE, RUN_METHOD = detect_run_mode() if HAS_PYLINDOL else (None, None)
+
+def build_scraper_session():
+    """Create pylindol's session to share across scrapers (None if it can't be built)."""
+    # Only pylindol's session carries the CA bundle and retries PHIVOLCS needs;
+    # without it, scrapers are left to build their own
     try:
-        if time_str:
-            datetime_str = f"{date_str} {time_str}"
+        from pylindol._http import build_session
+    except ImportError:
+        return None
+    return build_session()
+
+SCRAPER_SESSION = build_scraper_session() if HAS_PYLINDOL else None
+SCRAPER_TAKES_SESSION = SCRAPER_SESSION is not None and 'session' in inspect.signature(PhivolcsEarthquakeInfoScraper.__init__).parameters
+
+# Month-per-call scrapers may keep state between calls, so each worker thread
+# reuses its own instance rather than sharing one
+_thread_scrapers = threading.local()
+
+def thread_scraper():
+    """Return this thread's scraper, created on first use."""
+    scraper = getattr(_thread_scrapers, 'scraper', None)
+    if scraper is None:
+        scraper = PhivolcsEarthquakeInfoScraper()
+        if SCRAPER_SESSION is not None and hasattr(scraper, 'session'):
+            scraper.session = SCRAPER_SESSION
+        _thread_scrapers.scraper = scraper
+    return scraper
+
+def run_scraper(year, month):
+    """Fetch one month's DataFrame with pylindol (None if it can't select a month)."""
+    if RUN_MODE == 'constructor':
+        session_kwargs = {'session': SCRAPER_SESSION} if SCRAPER_TAKES_SESSION else {}
+        scraper = PhivolcsEarthquakeInfoScraper(month=month, year=year, **session_kwargs)
+        return getattr(scraper, RUN_METHOD)()
+    if RUN_MODE == 'kwargs':
+        return getattr(thread_scraper(), RUN_METHOD)(month=month, year=year)
+    if RUN_MODE == 'positional':
+        return getattr(thread_scraper(), RUN_METHOD)(month, year)
+    return None
+
+MAX_WORKERS = 8
+
+# Quakes encoded per write when streaming the response
+STREAM_BATCH_SIZE = 500
+# Bump when the JSON built from the cached frames changes, so old ETags stop matching
+RESPONSE_VERSION = 1
+
+# Months settle once the month after them ends; scraper output written after
+# that is kept on disk for good, anything earlier is refetched after an hour
+# Cache files are unpickled, so the directory is per-user and private
+CACHE_DIR = Path(tempfile.gettempdir()) / (
+    f'phivolcs_cache_{os.getuid()}' if hasattr(os, 'getuid') else 'phivolcs_cache')
+RECENT_MONTH_TTL = 60 * 60
+# Bump when the cached frames or the way they are read changes
+CACHE_VERSION = 2
+
+# PHIVOLCS reports Philippine time. Every month is normalized to it so naive
+# (older pylindol) and aware (pylindol 0.6+) months can be combined and sorted
+PHIVOLCS_TZ = 'Asia/Manila'
+
+DATETIME_FORMATS = (
+    "%d %B %Y - %I:%M %p", "%d %b %Y - %I:%M %p",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y",
+)
+
+# Slash dates like 01/02/2025 read both ways, so they are never locked in for a
+# whole column; dateutil (month first) decides each one as before
+PROBE_FORMATS = tuple(fmt for fmt in DATETIME_FORMATS if '/' not in fmt)
+
+ROLE_PATTERNS = {
+    'date': re.compile(r'date'),
+    'time': re.compile(r'^(?!.*date).*time'),
+    'lat': re.compile(r'^(?!.*lon).*lat'),
+    'lon': re.compile(r'^(?!.*lat).*lon'),
+    'depth': re.compile(r'depth'),
+    'magnitude': re.compile(r'mag'),
+    'location': re.compile(r'location|place|area'),
+}
+
+# Module-level cache keyed by the full string, so it persists across requests
+# handled by the same instance; bounded to keep memory finite
+@lru_cache(maxsize=8192)
+def parse_datetime(datetime_str):
+    """Parse a combined date/time string into a datetime (None if invalid)."""
+    if HAS_DATEUTIL:
+        try:
+            return date_parser.parse(datetime_str)
+        except (ValueError, OverflowError):
+            pass
+    
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(datetime_str, fmt)
+        except ValueError:
+            continue
+    
+    return None
+
+def infer_datetime_format(sample):
+    """Return the unambiguous known format that parses a sample datetime string."""
+    for fmt in PROBE_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def to_phivolcs_time(parsed):
+    """Localize a naive datetime Series to Philippine time, or convert an aware one."""
+    if parsed.dt.tz is None:
+        return parsed.dt.tz_localize(PHIVOLCS_TZ, ambiguous='NaT', nonexistent='NaT')
+    return parsed.dt.tz_convert(PHIVOLCS_TZ)
+
+def phivolcs_timestamp(value):
+    """Convert one parsed datetime (naive, aware or None) to a Philippine-time Timestamp."""
+    if value is None or pd.isna(value):
+        return pd.NaT
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize(PHIVOLCS_TZ, ambiguous='NaT', nonexistent='NaT')
+    return ts.tz_convert(PHIVOLCS_TZ)
+
+def resolve_column_roles(columns):
+    """Map each quake field to the DataFrame column that feeds it (or None)."""
+    cols_lower = [(col, str(col).lower().strip()) for col in columns]
+    return {
+        role: next((col for col, name in cols_lower if pattern.search(name)), None)
+        for role, pattern in ROLE_PATTERNS.items()
+    }
+
+def parse_datetime_column(df, roles):
+    """Parse the date (and time) columns of a DataFrame into a datetime Series."""
+    dates = df[roles['date']]
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return to_phivolcs_time(dates)
+    
+    combined = dates.astype(str).str.strip()
+    # A combined "date - time" column already carries the time of day
+    if roles['time'] is not None and 'time' not in str(roles['date']).lower():
+        times = df[roles['time']]
+        combined = combined.where(times.isna(), combined + ' ' + times.astype(str).str.strip())
+    combined = combined.where(dates.notna())
+    
+    # Probe one value for its format so pandas can parse the column in one pass
+    fmt = None
+    if combined.notna().any():
+        fmt = infer_datetime_format(combined[combined.notna()].iloc[0])
+    if fmt:
+        parsed = pd.to_datetime(combined, format=fmt, errors='coerce', cache=True)
+    else:
+        parsed = pd.Series(pd.NaT, index=combined.index, dtype='datetime64[ns]')
+    
+    # Rows pandas could not parse go through the dateutil/strptime fallback,
+    # which may return offsets; bring them to the column's zone before merging
+    parsed = to_phivolcs_time(parsed)
+    missing = parsed.isna() & combined.notna()
+    if missing.any():
+        fallback = combined[missing].map(lambda value: phivolcs_timestamp(parse_datetime(value)))
+        parsed = parsed.where(~missing, to_phivolcs_time(pd.to_datetime(fallback)))
+    return parsed
+
+def build_month_quakes(df, month, year):
+    """Convert one month of scraper output into a DataFrame of quake fields."""
+    roles = resolve_column_roles(df.columns)
+    if roles['date'] is None or roles['lat'] is None or roles['lon'] is None:
+        return None
+    
+    quakes = pd.DataFrame({'datetime': parse_datetime_column(df, roles)})
+    for field in ('lat', 'lon', 'depth', 'magnitude'):
+        if roles[field] is not None:
+            quakes[field] = pd.to_numeric(df[roles[field]], errors='coerce').astype('float64')
         else:
-            datetime_str = date_str
-        
-        if HAS_DATEUTIL:
-            try:
-                dt = date_parser.parse(datetime_str)
-                return dt.isoformat()
-            except:
-                pass
-        
-        formats = [
-            "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
-            "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
-            "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y",
-        ]
-        
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(datetime_str, fmt)
-                return dt.isoformat()
-            except:
-                continue
-        
+            quakes[field] = None
+    if roles['location'] is not None:
+        location = df[roles['location']]
+        quakes['location'] = location.astype(str).str.strip().where(location.notna())
+    else:
+        quakes['location'] = None
+    
+    return quakes[
+        quakes['datetime'].notna() & quakes['lat'].notna() & quakes['lon'].notna()
+        & (quakes['datetime'].dt.month == month) & (quakes['datetime'].dt.year == year)
+    ]
+
+def quakes_to_records(quakes):
+    """Format a quake DataFrame as the list of dicts the API returns."""
+    # JSON needs None rather than NaN; mask each column once with numpy
+    columns = {}
+    for field in ('lat', 'lon', 'location', 'magnitude', 'depth'):
+        if field == 'location':
+            values = quakes[field].to_numpy(dtype=object)
+            missing = pd.isna(values)
+        else:
+            values = quakes[field].to_numpy(dtype='float64')
+            missing = np.isnan(values)
+        column = values.astype(object)
+        column[missing] = None
+        columns[field] = column
+    
+    return [
+        {
+            "datetime": ts.isoformat(),
+            "lat": lat,
+            "lon": lon,
+            "location": location,
+            "magnitude": magnitude,
+            "depth": depth,
+            "source": "https://www.phivolcs.dost.gov.ph/",
+        }
+        for ts, lat, lon, location, magnitude, depth in zip(
+            quakes['datetime'], columns['lat'], columns['lon'],
+            columns['location'], columns['magnitude'], columns['depth'],
+        )
+    ]
+
+def month_cache_path(year, month):
+    return CACHE_DIR / f"v{CACHE_VERSION}_{year}_{month:02d}.pkl"
+
+def cache_dir_is_private():
+    """Create CACHE_DIR if needed; False unless only this user can write to it."""
+    try:
+        CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        info = os.lstat(CACHE_DIR)
+    except OSError:
+        return False
+    if not hasattr(os, 'getuid'):
+        # Windows: the temp directory is already per-user
+        return True
+    return S_ISDIR(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+def month_settled_at(year, month):
+    """Unix time after which PHIVOLCS no longer updates a month (start of month + 2)."""
+    year, month = (year, month + 2) if month <= 10 else (year + 1, month - 10)
+    return datetime(year, month, 1).timestamp()
+
+def fresh_cache_stat(year, month):
+    """Return the stat of a month's cache file, or None if missing, stale or unsafe."""
+    if not cache_dir_is_private():
+        return None
+    try:
+        stat = month_cache_path(year, month).stat()
+    except OSError:
         return None
-    except:
+    # Judge by when the file was written: a month cached while still in
+    # progress stays partial, so it keeps expiring even after it settles
+    if stat.st_mtime < month_settled_at(year, month) and time.time() - stat.st_mtime > RECENT_MONTH_TTL:
         return None
+    return stat
+
+def load_cached_month(year, month):
+    """Return the cached scraper DataFrame for a month, or None if missing or stale."""
+    if fresh_cache_stat(year, month) is None:
+        return None
+    try:
+        return pd.read_pickle(month_cache_path(year, month))
+    except Exception:
+        # Missing, unreadable or written by an incompatible pandas: refetch
+        return None
+
+def save_cached_month(year, month, df):
+    """Write a month's scraper DataFrame to the disk cache, ignoring failures."""
+    if not cache_dir_is_private():
+        return
+    path = month_cache_path(year, month)
+    # Unique per process and thread so concurrent writers never share a file
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+def cache_etag(tasks):
+    """ETag for a set of months, or None unless every month is freshly cached."""
+    digests = [f"cache-v{CACHE_VERSION}:response-v{RESPONSE_VERSION}".encode()]
+    for year, month in tasks:
+        stat = fresh_cache_stat(year, month)
+        if stat is None:
+            return None
+        digests.append(f"{year}_{month:02d}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return '"%s"' % hashlib.blake2b(b'|'.join(digests), digest_size=16).hexdigest()
+
+def fetch_one_month(task):
+    """Fetch one (year, month) from PHIVOLCS as a quake DataFrame (or None)."""
+    year, month = task
+    try:
+        df = load_cached_month(year, month)
+        if df is None:
+            df = run_scraper(year, month)
+            if df is not None and not df.empty:
+                save_cached_month(year, month, df)
+        
+        if df is not None and not df.empty:
+            return build_month_quakes(df, month, year)
+    except Exception:
+        pass
+    return None
+
+def month_tasks(years_back=1, target_month=None, target_year=None):
+    """List the (year, month) pairs a request covers."""
+    if target_month and target_year:
+        return [(target_year, target_month)]
+    
+    current_date = datetime.now()
+    tasks = []
+    for year_offset in range(years_back):
+        year = current_date.year - year_offset
+        max_month = current_date.month if year_offset == 0 else 12
+        tasks.extend((year, month) for month in range(1, max_month + 1))
+    return tasks
 
 def fetch_earthquakes(years_back=1, target_month=None, target_year=None):
     """Fetch earthquake data from PHIVOLCS."""
     if not HAS_PYLINDOL:
         return []
     
-    all_quakes = []
-    current_date = datetime.now()
+    tasks = month_tasks(years_back, target_month, target_year)
     
-    if target_month and target_year:
-        years_to_process = [(target_year, [target_month])]
-    else:
-        years_to_process = []
-        for year_offset in range(years_back):
-            year = current_date.year - year_offset
-            max_month = current_date.month if year_offset == 0 else 12
-            months = list(range(1, max_month + 1))
-            years_to_process.append((year, months))
-    
-    for year, months_list in years_to_process:
-        for month in months_list:
-            try:
-                scraper = PhivolcsEarthquakeInfoScraper()
-                
-                # Try to fetch data
-                df = None
-                try:
-                    import inspect
-                    sig = inspect.signature(scraper.run)
-                    params = list(sig.parameters.keys())
-                    
-                    if 'month' in params and 'year' in params:
-                        df = scraper.run(month=month, year=year)
-                    elif len(params) >= 2:
-                        df = scraper.run(month, year)
-                except:
-                    pass
-                
-                if df is not None and not df.empty:
-                    month_quakes = []
-                    for _, row in df.iterrows():
-                        quake = {
-                            "datetime": None,
-                            "lat": None,
-                            "lon": None,
-                            "location": None,
-                            "magnitude": None,
-                            "depth": None,
-                            "source": "https://www.phivolcs.dost.gov.ph/"
-                        }
-                        
-                        for col in df.columns:
-                            col_lower = str(col).lower().strip()
-                            col_value = row[col]
-                            
-                            if pd.isna(col_value):
-                                continue
-                            
-                            if 'date' in col_lower and quake["datetime"] is None:
-                                date_str = str(col_value).strip()
-                                time_col = None
-                                for tc in df.columns:
-                                    if 'time' in str(tc).lower() and 'date' not in str(tc).lower():
-                                        time_col = tc
-                                        break
-                                
-                                time_str = None
-                                if time_col and not pd.isna(row[time_col]):
-                                    time_str = str(row[time_col]).strip()
-                                
-                                parsed_dt = parse_datetime(date_str, time_str)
-                                if parsed_dt:
-                                    quake["datetime"] = parsed_dt
-                            
-                            if 'lat' in col_lower and 'lon' not in col_lower:
-                                try:
-                                    quake["lat"] = float(col_value)
-                                except:
-                                    pass
-                            
-                            if ('lon' in col_lower or 'long' in col_lower) and 'lat' not in col_lower:
-                                try:
-                                    quake["lon"] = float(col_value)
-                                except:
-                                    pass
-                            
-                            if 'depth' in col_lower:
-                                try:
-                                    quake["depth"] = float(col_value)
-                                except:
-                                    pass
-                            
-                            if 'magnitude' in col_lower or 'mag' in col_lower:
-                                try:
-                                    quake["magnitude"] = float(col_value)
-                                except:
-                                    pass
-                            
-                            if 'location' in col_lower or 'place' in col_lower or 'area' in col_lower:
-                                quake["location"] = str(col_value).strip() if not pd.isna(col_value) else "Unknown location"
-                        
-                        if (quake["datetime"] and quake["lat"] is not None and quake["lon"] is not None):
-                            try:
-                                test_date = datetime.fromisoformat(quake["datetime"].replace('Z', '+00:00'))
-                                quake_month = test_date.month
-                                quake_year = test_date.year
-                                
-                                if quake_month == month and quake_year == year:
-                                    month_quakes.append(quake)
-                            except:
-                                pass
-                    
-                    all_quakes.extend(month_quakes)
-            except Exception as e:
-                continue
+    # Months are independent and network-bound, so fetch them on threads
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        monthly = [quakes for quakes in executor.map(fetch_one_month, tasks)
+                   if quakes is not None and not quakes.empty]
+    if not monthly:
+        return []
     
-    return all_quakes
+    # Drop repeated quakes, then sort on the datetime64 column (most recent first)
+    all_quakes = pd.concat(monthly, ignore_index=True)
+    all_quakes = all_quakes.drop_duplicates(subset=['datetime', 'lat', 'lon'], keep='first')
+    all_quakes = all_quakes.sort_values('datetime', ascending=False, kind='stable')
+    return quakes_to_records(all_quakes)
+
+def dumps_json(data):
+    """Serialize a response body to JSON bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+def write_quakes_json(wfile, quakes):
+    """Stream {"quakes": [...]} to wfile in batches instead of one large buffer."""
+    wfile.write(b'{"quakes":[')
+    for start in range(0, len(quakes), STREAM_BATCH_SIZE):
+        if start:
+            wfile.write(b',')
+        # Encode the batch as a JSON array and drop its brackets
+        wfile.write(dumps_json(quakes[start:start + STREAM_BATCH_SIZE])[1:-1])
+    wfile.write(b']}')
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
+        headers_sent = False
         try:
             from urllib.parse import urlparse, parse_qs
             parsed_url = urlparse(self.path)
@@ -177,20 +429,42 @@ class handler(BaseHTTPRequestHandler):
             target_month = int(params.get('month', [None])[0]) if params.get('month') else None
             target_year = int(params.get('year', [None])[0]) if params.get('year') else None
             
-            quakes = fetch_earthquakes(years_back, target_month, target_year)
-            quakes.sort(key=lambda x: x.get("datetime", ""), reverse=True)
+            # When every month is already cached the response can't have
+            # changed, so a matching client copy needs no fetch or encode
+            tasks = month_tasks(years_back, target_month, target_year)
+            etag = cache_etag(tasks)
+            client_etags = {tag.strip().removeprefix('W/')
+                            for tag in self.headers.get('If-None-Match', '').split(',')}
+            if etag is not None and etag in client_etags:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
             
-            response = {"quakes": quakes}
+            quakes = fetch_earthquakes(years_back, target_month, target_year)
+            etag = cache_etag(tasks)
             
+            # No Content-Length: the body is streamed and ends when the
+            # connection closes (BaseHTTPRequestHandler speaks HTTP/1.0)
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
+            if etag is not None:
+                self.send_header('ETag', etag)
             self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            headers_sent = True
+            write_quakes_json(self.wfile, quakes)
             
         except Exception as e:
-            error_response = {"quakes": [], "error": str(e)}
+            if headers_sent:
+                # The 200 status is already out, so a second response would end
+                # up inside the body; log it and cut the stream short instead
+                self.log_error('Failed while streaming quakes: %s', e)
+                self.close_connection = True
+                return
+            body = dumps_json({"quakes": [], "error": str(e)})
             self.send_response(500)
             self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-            self.wfile.write(json.dumps(error_response).encode())
+            self.wfile.write(body)
 
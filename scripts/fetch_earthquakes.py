@@ -4,10 +4,21 @@ Python script to fetch earthquake data from PHIVOLCS using pylindol
 and output as JSON for Next.js API consumption.
 """
 
+import os
+import re
 import sys
 import json
+import time
+import inspect
+import tempfile
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from stat import S_ISDIR
 
 # Try to import dateutil, fallback to basic parsing if not available
 try:
@@ -18,54 +29,621 @@ except ImportError:
 
 from pylindol import PhivolcsEarthquakeInfoScraper
 
-def parse_datetime(date_str, time_str=None):
+# Scraper methods that may return a month of data, in order of preference
+SCRAPER_METHODS = ("run", "fetch", "scrape", "get")
+
+def detect_run_mode():
+    """
+    Work out how to fetch a given month with pylindol in-process.
+    
+    pylindol's API differs between versions: older releases take the month
+    and year in run(), newer ones take them in the constructor and return
+    the data from fetch().
+    
+    Returns:
+        Tuple of (mode, method name). mode is "kwargs" for method(month=..., year=...),
+        "positional" for run(month, year), "constructor" for
+        PhivolcsEarthquakeInfoScraper(month=..., year=...).method(), or None
+        if no in-process call can select a month
+    """
+    # Skip "self": these are functions on the class, not bound methods
+    for name in SCRAPER_METHODS:
+        method = getattr(PhivolcsEarthquakeInfoScraper, name, None)
+        if not callable(method):
+            continue
+        params = list(inspect.signature(method).parameters)[1:]
+        if 'month' in params and 'year' in params:
+            return "kwargs", name
+        if name == "run" and len(params) >= 2:
+            return "positional", name
+    
+    params = list(inspect.signature(PhivolcsEarthquakeInfoScraper.__init__).parameters)[1:]
+    if 'month' in params and 'year' in params:
+        # Prefer fetch(), which returns the data without exporting a file
+        for name in ("fetch", "run"):
+            if callable(getattr(PhivolcsEarthquakeInfoScraper, name, None)):
+                return "constructor", name
+    
+    return None, None
+
+# The scraper API is the same for every month, so inspect it once
+RUN_MODE, RUN_METHOD = detect_run_mode()
+
+def build_scraper_session():
+    """
+    Create the HTTP session shared by every scraper.
+    
+    Reusing one session keeps connections to PHIVOLCS alive across months
+    instead of paying a new TCP/TLS handshake for each one.
+    
+    Returns:
+        pylindol's preconfigured session, or None if this pylindol version
+        doesn't provide one. A plain requests.Session is never substituted:
+        it lacks the bundled CA certificate and retries PHIVOLCS needs, so
+        scrapers are then left to build their own sessions.
+    """
+    try:
+        from pylindol._http import build_session
+    except ImportError:
+        return None
+    return build_session()
+
+SCRAPER_SESSION = build_scraper_session()
+SCRAPER_TAKES_SESSION = (
+    SCRAPER_SESSION is not None
+    and 'session' in inspect.signature(PhivolcsEarthquakeInfoScraper.__init__).parameters
+)
+
+# Scrapers that take the month per call may keep state between calls, so
+# each worker thread reuses its own instance rather than sharing one
+_thread_scrapers = threading.local()
+
+def thread_scraper():
+    """
+    Get the scraper instance owned by the current worker thread.
+    
+    Returns:
+        PhivolcsEarthquakeInfoScraper, created on first use and pointed at
+        the shared session if there is one and the scraper exposes it
+    """
+    scraper = getattr(_thread_scrapers, "scraper", None)
+    if scraper is None:
+        scraper = PhivolcsEarthquakeInfoScraper()
+        if SCRAPER_SESSION is not None and hasattr(scraper, "session"):
+            scraper.session = SCRAPER_SESSION
+        _thread_scrapers.scraper = scraper
+    return scraper
+
+def run_scraper(year, month):
+    """
+    Fetch one month of data by calling pylindol in-process.
+    
+    Args:
+        year: Year to fetch
+        month: Month to fetch (1-12)
+    
+    Returns:
+        Whatever the scraper method returns (normally a DataFrame)
+    
+    Raises:
+        TypeError: If this pylindol version cannot fetch a given month in-process
+    """
+    if RUN_MODE == "constructor":
+        session_kwargs = {"session": SCRAPER_SESSION} if SCRAPER_TAKES_SESSION else {}
+        scraper = PhivolcsEarthquakeInfoScraper(month=month, year=year, **session_kwargs)
+        return getattr(scraper, RUN_METHOD)()
+    
+    if RUN_MODE == "kwargs":
+        return getattr(thread_scraper(), RUN_METHOD)(month=month, year=year)
+    if RUN_MODE == "positional":
+        return getattr(thread_scraper(), RUN_METHOD)(month, year)
+    
+    raise TypeError("pylindol has no method that accepts month/year parameters")
+
+# Number of months fetched from PHIVOLCS in parallel
+MAX_WORKERS = 8
+
+# Raw pylindol output is cached on disk per month. PHIVOLCS stops updating a
+# month once the month after it ends, so a cache file written after that is
+# reused indefinitely; one written earlier may be partial and expires after
+# an hour (see fresh_cache_stat).
+# Cache files are unpickled, which can run code, so the directory is
+# per-user and must not be writable by anyone else (see cache_dir_is_private).
+CACHE_DIR = Path(tempfile.gettempdir()) / (
+    f"phivolcs_cache_{os.getuid()}" if hasattr(os, "getuid") else "phivolcs_cache")
+RECENT_MONTH_TTL = 60 * 60  # seconds
+# Part of every cache file name; bump it when the cached frames or the way
+# they are read changes, so stale entries are ignored instead of misread
+CACHE_VERSION = 2
+
+# PHIVOLCS reports Philippine time. Older pylindol versions return naive
+# datetimes and 0.6+ returns Asia/Manila-aware ones, so every month is
+# normalized to this zone before months are combined and sorted
+PHIVOLCS_TZ = "Asia/Manila"
+
+# Datetime formats seen in PHIVOLCS data, most likely first
+DATETIME_FORMATS = (
+    "%d %B %Y - %I:%M %p",  # PHIVOLCS pages, e.g. "15 January 2025 - 02:30 PM"
+    "%d %b %Y - %I:%M %p",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y",
+)
+
+# Formats safe to apply to a whole column from one sample. Slash dates such as
+# "01/02/2025" read as either day or month first, so they are left to dateutil
+# (month first), row by row, the same way every other row would be read
+PROBE_FORMATS = tuple(fmt for fmt in DATETIME_FORMATS if "/" not in fmt)
+
+# Column-name patterns for each earthquake field, matched against lower-cased labels
+ROLE_PATTERNS = {
+    "date": re.compile(r'date'),
+    "time": re.compile(r'^(?!.*date).*time'),
+    "lat": re.compile(r'^(?!.*lon).*lat'),
+    "lon": re.compile(r'^(?!.*lat).*lon'),
+    "depth": re.compile(r'depth'),
+    "magnitude": re.compile(r'mag'),
+    "location": re.compile(r'location|place|area'),
+}
+
+@lru_cache(maxsize=8192)
+def parse_datetime(datetime_str):
+    """
+    Parse a combined date/time string into a datetime.
+    
+    Results are memoized by the full string in a bounded LRU cache: rows
+    within a month repeat the same date strings, so each distinct string
+    only goes through dateutil/strptime once.
+    
+    Args:
+        datetime_str: Date and optional time (e.g., "2025-01-15 14:30:00"
+            or "15/01/2025")
+    
+    Returns:
+        datetime object or None if invalid. The object itself is returned
+        (rather than an ISO string) so callers don't parse the value twice.
+    """
+    # Try parsing with dateutil (handles various formats)
+    if HAS_DATEUTIL:
+        try:
+            return date_parser.parse(datetime_str)
+        except (ValueError, OverflowError):
+            # dateutil's ParserError is a ValueError; huge numbers overflow
+            pass
+    
+    # Fallback: try common formats
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(datetime_str, fmt)
+        except ValueError:
+            continue
+    
+    return None
+
+def infer_datetime_format(sample):
+    """
+    Find the format of a datetime string by probing PROBE_FORMATS.
+    
+    Args:
+        sample: One datetime string from the column being parsed
+    
+    Returns:
+        The first matching strptime format, or None if none match or the
+        sample could be read more than one way
+    """
+    for fmt in PROBE_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def to_phivolcs_time(parsed):
+    """
+    Put a datetime Series in Philippine time.
+    
+    Args:
+        parsed: datetime64 Series, naive or timezone-aware
+    
+    Returns:
+        The Series localized to PHIVOLCS_TZ if it was naive, or converted
+        to it if it was aware
+    """
+    if parsed.dt.tz is None:
+        return parsed.dt.tz_localize(PHIVOLCS_TZ, ambiguous="NaT", nonexistent="NaT")
+    return parsed.dt.tz_convert(PHIVOLCS_TZ)
+
+def phivolcs_timestamp(value):
+    """
+    Put one parsed datetime in Philippine time.
+    
+    Args:
+        value: datetime from parse_datetime(), naive, with an offset, or None
+    
+    Returns:
+        Timestamp in PHIVOLCS_TZ, or NaT if value is missing
+    """
+    if value is None or pd.isna(value):
+        return pd.NaT
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize(PHIVOLCS_TZ, ambiguous="NaT", nonexistent="NaT")
+    return ts.tz_convert(PHIVOLCS_TZ)
+
+def resolve_column_roles(columns):
+    """
+    Work out which DataFrame column feeds each earthquake field.
+    
+    Args:
+        columns: DataFrame column labels as returned by pylindol
+    
+    Returns:
+        Dict mapping field name to its column label, or None when no column matches
+    """
+    # Lower-case every column name once instead of once per row
+    cols_lower = [(col, str(col).lower().strip()) for col in columns]
+    return {
+        role: next((col for col, name in cols_lower if pattern.search(name)), None)
+        for role, pattern in ROLE_PATTERNS.items()
+    }
+
+def parse_datetime_column(df, roles):
+    """
+    Parse the date (and optional time) columns of a DataFrame in one pass.
+    
+    Args:
+        df: DataFrame returned by pylindol
+        roles: Column roles from resolve_column_roles()
+    
+    Returns:
+        Series of Asia/Manila Timestamps aligned with df, NaT where the value
+        could not be parsed
+    """
+    dates = df[roles["date"]]
+    
+    # Newer pylindol versions already return parsed Timestamps
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return to_phivolcs_time(dates)
+    
+    combined = dates.astype(str).str.strip()
+    # A combined "Date - Time" column already carries the time of day
+    if roles["time"] is not None and 'time' not in str(roles["date"]).lower():
+        times = df[roles["time"]]
+        combined = combined.where(times.isna(), combined + " " + times.astype(str).str.strip())
+    combined = combined.where(dates.notna())
+    
+    # Probe the first value for its format so pandas can apply it to the
+    # whole column instead of falling back to dateutil per row. Without a
+    # safe format every row goes through parse_datetime(), so a column is
+    # never read two different ways
+    fmt = None
+    if combined.notna().any():
+        fmt = infer_datetime_format(combined[combined.notna()].iloc[0])
+    if fmt:
+        parsed = pd.to_datetime(combined, format=fmt, errors="coerce", cache=True)
+    else:
+        parsed = pd.Series(pd.NaT, index=combined.index, dtype="datetime64[ns]")
+    
+    # Rows pandas could not parse go through the dateutil/strptime fallback.
+    # It can return naive datetimes or ones with an offset, so each result is
+    # put in Philippine time first; otherwise the merged column turns into
+    # plain objects and loses its .dt accessor
+    parsed = to_phivolcs_time(parsed)
+    missing = parsed.isna() & combined.notna()
+    if missing.any():
+        fallback = combined[missing].map(lambda value: phivolcs_timestamp(parse_datetime(value)))
+        parsed = parsed.where(~missing, to_phivolcs_time(pd.to_datetime(fallback)))
+    
+    return parsed
+
+def build_month_quakes(df, month, year):
+    """
+    Convert one month of pylindol output into a DataFrame of earthquake fields.
+    
+    Args:
+        df: DataFrame returned by pylindol for a single month
+        month: Month that was requested (1-12)
+        year: Year that was requested
+    
+    Returns:
+        DataFrame (datetime as Timestamps) of the earthquakes that have a
+        datetime, latitude and longitude and fall inside the requested
+        month/year, or None if the essential columns are missing
+    """
+    roles = resolve_column_roles(df.columns)
+    if roles["date"] is None or roles["lat"] is None or roles["lon"] is None:
+        print(f"  ⚠️  Could not find date/latitude/longitude columns in {list(df.columns)}", file=sys.stderr)
+        return None
+    
+    quakes = pd.DataFrame({"datetime": parse_datetime_column(df, roles)})
+    
+    # Numeric columns: anything that isn't a number becomes NaN
+    for field in ("lat", "lon", "depth", "magnitude"):
+        if roles[field] is not None:
+            quakes[field] = pd.to_numeric(df[roles[field]], errors="coerce").astype("float64")
+        else:
+            quakes[field] = None
+    
+    if roles["location"] is not None:
+        location = df[roles["location"]]
+        quakes["location"] = location.astype(str).str.strip().where(location.notna())
+    else:
+        quakes["location"] = None
+    
+    # Only keep rows with essential data from the requested month/year
+    has_data = quakes["datetime"].notna() & quakes["lat"].notna() & quakes["lon"].notna()
+    in_month = (quakes["datetime"].dt.month == month) & (quakes["datetime"].dt.year == year)
+    skipped = int((has_data & ~in_month).sum())
+    if skipped:
+        print(f"  ⚠️  Skipped {skipped} row(s) dated outside {year}-{month:02d}", file=sys.stderr)
+    return quakes[has_data & in_month]
+
+def quakes_to_records(quakes):
+    """
+    Convert an earthquake DataFrame into JSON-ready dictionaries.
+    
+    Args:
+        quakes: DataFrame as returned by build_month_quakes()
+    
+    Returns:
+        List of earthquake dictionaries with ISO 8601 datetimes
+    """
+    # JSON needs None rather than NaN. Pull each column out as a numpy array
+    # and mask it once, instead of boxing every value and checking it
+    columns = {}
+    for field in ("lat", "lon", "location", "magnitude", "depth"):
+        if field == "location":
+            values = quakes[field].to_numpy(dtype=object)
+            missing = pd.isna(values)
+        else:
+            values = quakes[field].to_numpy(dtype="float64")
+            missing = np.isnan(values)
+        column = values.astype(object)
+        column[missing] = None
+        columns[field] = column
+    
+    # Emit each record once, formatting the datetime as ISO 8601 on the way
+    return [
+        {
+            "datetime": ts.isoformat(),
+            "lat": lat,
+            "lon": lon,
+            "location": location,
+            "magnitude": magnitude,
+            "depth": depth,
+            "source": "https://www.phivolcs.dost.gov.ph/",
+        }
+        for ts, lat, lon, location, magnitude, depth in zip(
+            quakes["datetime"], columns["lat"], columns["lon"],
+            columns["location"], columns["magnitude"], columns["depth"],
+        )
+    ]
+
+def month_cache_path(year, month):
+    """Path of the cache file for one month."""
+    return CACHE_DIR / f"v{CACHE_VERSION}_{year}_{month:02d}.pkl"
+
+def cache_dir_is_private():
+    """
+    Create the cache directory if needed and check that it is safe to use.
+    
+    The temp directory is shared, so another user could create CACHE_DIR
+    first and plant pickles in it. The cache is only used when CACHE_DIR is
+    a real directory owned by this user with no group/other permissions.
+    
+    Returns:
+        True if cache files may be read and written
+    """
+    try:
+        CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        info = os.lstat(CACHE_DIR)
+    except OSError:
+        return False
+    
+    if not hasattr(os, "getuid"):
+        # Windows: the temp directory is already per-user
+        return True
+    return S_ISDIR(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+def month_settled_at(year, month):
+    """
+    Get the time after which PHIVOLCS no longer updates a month.
+    
+    Args:
+        year: Year of the month
+        month: Month (1-12)
+    
+    Returns:
+        Unix timestamp of the start of the month after next
+    """
+    year, month = (year, month + 2) if month <= 10 else (year + 1, month - 10)
+    return datetime(year, month, 1).timestamp()
+
+def fresh_cache_stat(year, month):
+    """
+    Check whether a month's cache file can be used.
+    
+    Args:
+        year: Year of the cache entry
+        month: Month of the cache entry (1-12)
+    
+    Returns:
+        os.stat_result of the cache file, or None if it is missing, stale
+        or the cache directory is unsafe
+    """
+    if not cache_dir_is_private():
+        return None
+    
+    try:
+        stat = month_cache_path(year, month).stat()
+    except OSError:
+        return None
+    
+    # Freshness depends on when the file was written, not on today's date:
+    # a month cached while still in progress holds partial data, so it keeps
+    # expiring even after the month itself has settled
+    if stat.st_mtime < month_settled_at(year, month) and time.time() - stat.st_mtime > RECENT_MONTH_TTL:
+        return None
+    return stat
+
+def load_cached_month(year, month):
+    """
+    Load a month's pylindol DataFrame from the disk cache.
+    
+    Args:
+        year: Year to load
+        month: Month to load (1-12)
+    
+    Returns:
+        The cached DataFrame, or None if there is no usable cache entry
+    """
+    if fresh_cache_stat(year, month) is None:
+        return None
+    
+    try:
+        return pd.read_pickle(month_cache_path(year, month))
+    except Exception:
+        # Missing, unreadable or written by an incompatible pandas: refetch
+        return None
+
+def save_cached_month(year, month, df):
     """
-    Parse date and time strings into ISO 8601 format.
+    Store a month's pylindol DataFrame in the disk cache.
+    
+    Failures are ignored: the cache only saves work, it is never required.
     
     Args:
-        date_str: Date string (e.g., "2025-01-15" or "15/01/2025")
-        time_str: Optional time string (e.g., "14:30:00" or "14:30")
+        year: Year of the data
+        month: Month of the data (1-12)
+        df: DataFrame returned by pylindol
+    """
+    if not cache_dir_is_private():
+        return
+    
+    path = month_cache_path(year, month)
+    # Write to a temporary file first so readers never see a partial file.
+    # The pid and thread id keep concurrent writers of one month apart
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"  ⚠️  Could not cache {year}-{month:02d}: {str(e)}", file=sys.stderr)
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+def fetch_month_dataframe(year, month):
+    """
+    Download one month of raw earthquake data with pylindol.
+    
+    Args:
+        year: Year to fetch
+        month: Month to fetch (1-12)
     
     Returns:
-        ISO 8601 formatted datetime string or None if invalid
+        DataFrame as returned by pylindol, or None if nothing could be fetched
     """
+    # Fetch data for this month/year in-process first; spawning the CLI is
+    # far slower, so it is only used when the library API can't select a month
+    df = None
     try:
-        # Try to parse the date string
-        if time_str:
-            datetime_str = f"{date_str} {time_str}"
+        df = run_scraper(year, month)
+        if df is not None:
+            print(f"  📥 Fetched data using {RUN_METHOD}() for {year}-{month:02d}: {len(df) if not df.empty else 0} rows", file=sys.stderr)
         else:
-            datetime_str = date_str
-        
-        # Try parsing with dateutil (handles various formats)
-        if HAS_DATEUTIL:
-            try:
-                dt = date_parser.parse(datetime_str)
-                return dt.isoformat()
-            except:
-                pass
+            print(f"  ⚠️  {RUN_METHOD}() returned None for {year}-{month:02d}", file=sys.stderr)
+    except (TypeError, AttributeError) as e:
+        # If pylindol can't fetch a month in-process, try using CLI as fallback
+        print(f"  ⚠️  In-process fetch failed: {str(e)}", file=sys.stderr)
+        print(f"  🔄 Trying pylindol CLI as fallback...", file=sys.stderr)
         
-        # Fallback: try common formats
-        formats = [
-            "%Y-%m-%d %H:%M:%S",
-            "%Y-%m-%d %H:%M",
-            "%Y-%m-%d",
-            "%d/%m/%Y %H:%M:%S",
-            "%d/%m/%Y %H:%M",
-            "%d/%m/%Y",
-            "%m/%d/%Y %H:%M:%S",
-            "%m/%d/%Y %H:%M",
-            "%m/%d/%Y",
-        ]
+        try:
+            import subprocess
+            
+            # Create temp directory for output
+            with tempfile.TemporaryDirectory() as tmpdir:
+                output_file = os.path.join(tmpdir, f"earthquakes_{year}_{month}.csv")
+                
+                # Call pylindol CLI
+                cmd = ["pylindol", "--month", str(month), "--year", str(year), "--output-path", tmpdir]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+                
+                if result.returncode == 0:
+                    # Try to find the output file
+                    csv_files = [f for f in os.listdir(tmpdir) if f.endswith('.csv')]
+                    if csv_files:
+                        csv_path = os.path.join(tmpdir, csv_files[0])
+                        df = pd.read_csv(csv_path)
+                        print(f"  ✅ Fetched data using CLI for {year}-{month:02d}: {len(df)} rows", file=sys.stderr)
+                    else:
+                        print(f"  ⚠️  CLI ran but no CSV file found", file=sys.stderr)
+                        df = None
+                else:
+                    print(f"  ⚠️  CLI failed: {result.stderr}", file=sys.stderr)
+                    df = None
+        except FileNotFoundError:
+            print(f"  ⚠️  pylindol CLI not found in PATH", file=sys.stderr)
+            df = None
+        except Exception as cli_err:
+            print(f"  ⚠️  CLI fallback failed: {str(cli_err)}", file=sys.stderr)
+            df = None
+    except Exception as e:
+        # Other errors - log and continue
+        print(f"  ❌ Error fetching {year}-{month:02d}: {str(e)}", file=sys.stderr)
+        df = None
+    
+    return df
+
+def fetch_one_month(year, month, show_sample=False):
+    """
+    Fetch and convert one month of earthquake data from PHIVOLCS.
+    
+    Args:
+        year: Year to fetch
+        month: Month to fetch (1-12)
+        show_sample: Print the DataFrame columns and a sample row for debugging
+    
+    Returns:
+        DataFrame of that month's earthquakes, or None on failure
+    """
+    try:
+        df = load_cached_month(year, month)
+        if df is not None:
+            print(f"  💾 Loaded {year}-{month:02d} from cache: {len(df)} rows", file=sys.stderr)
+        else:
+            df = fetch_month_dataframe(year, month)
+            if df is not None and not df.empty:
+                save_cached_month(year, month, df)
         
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(datetime_str, fmt)
-                return dt.isoformat()
-            except:
-                continue
+        if df is not None and not df.empty:
+            # Print column names for debugging (always print for first fetch)
+            if show_sample:
+                print(f"📋 DataFrame columns: {list(df.columns)}", file=sys.stderr)
+                print(f"📋 DataFrame shape: {df.shape}", file=sys.stderr)
+                # Print first row as sample
+                if len(df) > 0:
+                    print(f"📋 Sample row: {df.iloc[0].to_dict()}", file=sys.stderr)
+            
+            month_quakes = build_month_quakes(df, month, year)
+            found = 0 if month_quakes is None else len(month_quakes)
+            print(f"  ✅ {year}-{month:02d}: Found {found} earthquakes", file=sys.stderr)
+            return month_quakes
         
+        print(f"  ⚠️  {year}-{month:02d}: No data available", file=sys.stderr)
         return None
+        
     except Exception as e:
+        # Continue to next month if this one fails
+        print(f"  ❌ Error fetching {year}-{month:02d}: {str(e)}", file=sys.stderr)
         return None
 
 def fetch_earthquakes(years_back=1, target_month=None, target_year=None):
@@ -78,253 +656,54 @@ def fetch_earthquakes(years_back=1, target_month=None, target_year=None):
         target_year: Optional specific year to fetch
     
     Returns:
-        List of earthquake dictionaries
+        List of earthquake dictionaries, most recent first
     """
-    all_quakes = []
     current_date = datetime.now()
     
     # If specific month/year requested, fetch only that
     if target_month and target_year:
-        years_to_process = [(target_year, [target_month])]
-        total_months = 1
+        tasks = [(target_year, target_month)]
     else:
-        # Calculate total months for progress tracking
-        total_months = 0
-        years_to_process = []
+        tasks = []
         for year_offset in range(years_back):
             year = current_date.year - year_offset
             max_month = current_date.month if year_offset == 0 else 12
-            months = list(range(1, max_month + 1))
-            years_to_process.append((year, months))
-            total_months += len(months)
+            tasks.extend((year, month) for month in range(1, max_month + 1))
     
+    total_months = len(tasks)
     print(f"Will fetch {total_months} month(s) of data...", file=sys.stderr)
-    months_fetched = 0
+    if RUN_MODE:
+        print(f"🔍 pylindol call style: {RUN_METHOD}() via {RUN_MODE}", file=sys.stderr)
+    else:
+        print("🔍 pylindol can't select a month in-process, will use the CLI", file=sys.stderr)
     
-    # Fetch data for each month
-    for year, months_list in years_to_process:
-        for month in months_list:
-            months_fetched += 1
-            print(f"Fetching {year}-{month:02d} ({months_fetched}/{total_months})...", file=sys.stderr)
-            
-            try:
-                # Create a scraper instance for this month/year
-                scraper = PhivolcsEarthquakeInfoScraper()
-                
-                # Fetch data for this month/year
-                # pylindol's run() method signature: run(month=None, year=None)
-                # If month/year are provided, it should fetch that specific month
-                df = None
-                try:
-                    # Try with month/year parameters first
-                    # Check if pylindol supports keyword arguments
-                    import inspect
-                    sig = inspect.signature(scraper.run)
-                    params = list(sig.parameters.keys())
-                    print(f"  🔍 run() method parameters: {params}", file=sys.stderr)
-                    
-                    # Try calling with month/year
-                    if 'month' in params and 'year' in params:
-                        df = scraper.run(month=month, year=year)
-                        if df is not None:
-                            print(f"  📥 Fetched data using month/year params for {year}-{month:02d}: {len(df) if not df.empty else 0} rows", file=sys.stderr)
-                        else:
-                            print(f"  ⚠️  run(month={month}, year={year}) returned None", file=sys.stderr)
-                    elif len(params) >= 2:
-                        # Try positional arguments
-                        df = scraper.run(month, year)
-                        if df is not None:
-                            print(f"  📥 Fetched data using positional args for {year}-{month:02d}: {len(df) if not df.empty else 0} rows", file=sys.stderr)
-                        else:
-                            print(f"  ⚠️  run({month}, {year}) returned None", file=sys.stderr)
-                    else:
-                        # No parameters supported, raise error to go to fallback
-                        raise TypeError("run() doesn't accept month/year parameters")
-                except (TypeError, AttributeError) as e:
-                    # If run() doesn't accept parameters, try using CLI as fallback
-                    print(f"  ⚠️  run(month, year) failed: {str(e)}", file=sys.stderr)
-                    print(f"  🔄 Trying pylindol CLI as fallback...", file=sys.stderr)
-                    
-                    try:
-                        import subprocess
-                        import tempfile
-                        import os
-                        
-                        # Create temp directory for output
-                        with tempfile.TemporaryDirectory() as tmpdir:
-                            output_file = os.path.join(tmpdir, f"earthquakes_{year}_{month}.csv")
-                            
-                            # Call pylindol CLI
-                            cmd = ["pylindol", "--month", str(month), "--year", str(year), "--output-path", tmpdir]
-                            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-                            
-                            if result.returncode == 0:
-                                # Try to find the output file
-                                csv_files = [f for f in os.listdir(tmpdir) if f.endswith('.csv')]
-                                if csv_files:
-                                    csv_path = os.path.join(tmpdir, csv_files[0])
-                                    df = pd.read_csv(csv_path)
-                                    print(f"  ✅ Fetched data using CLI for {year}-{month:02d}: {len(df)} rows", file=sys.stderr)
-                                else:
-                                    print(f"  ⚠️  CLI ran but no CSV file found", file=sys.stderr)
-                                    df = None
-                            else:
-                                print(f"  ⚠️  CLI failed: {result.stderr}", file=sys.stderr)
-                                df = None
-                    except FileNotFoundError:
-                        print(f"  ⚠️  pylindol CLI not found in PATH", file=sys.stderr)
-                        df = None
-                    except Exception as cli_err:
-                        print(f"  ⚠️  CLI fallback failed: {str(cli_err)}", file=sys.stderr)
-                        df = None
-                except Exception as e:
-                    # Other errors - log and continue
-                    print(f"  ❌ Error fetching {year}-{month:02d}: {str(e)}", file=sys.stderr)
-                    df = None
-                
-                if df is not None and not df.empty:
-                    # Print column names for debugging (always print for first fetch)
-                    if months_fetched == 1:
-                        print(f"📋 DataFrame columns: {list(df.columns)}", file=sys.stderr)
-                        print(f"📋 DataFrame shape: {df.shape}", file=sys.stderr)
-                        # Print first row as sample
-                        if len(df) > 0:
-                            print(f"📋 Sample row: {df.iloc[0].to_dict()}", file=sys.stderr)
-                    
-                    month_quakes = []
-                    # Convert DataFrame to list of dictionaries
-                    for _, row in df.iterrows():
-                        quake = {
-                            "datetime": None,
-                            "lat": None,
-                            "lon": None,
-                            "location": None,
-                            "magnitude": None,
-                            "depth": None,
-                            "source": "https://www.phivolcs.dost.gov.ph/"
-                        }
-                        
-                        # Map DataFrame columns to our format
-                        # Try to find columns by common names
-                        for col in df.columns:
-                            col_lower = str(col).lower().strip()
-                            col_value = row[col]
-                            
-                            # Skip NaN values
-                            if pd.isna(col_value):
-                                continue
-                            
-                            # Date/Time handling
-                            if 'date' in col_lower and quake["datetime"] is None:
-                                date_str = str(col_value).strip()
-                                # Try to find time column
-                                time_col = None
-                                for tc in df.columns:
-                                    if 'time' in str(tc).lower() and 'date' not in str(tc).lower():
-                                        time_col = tc
-                                        break
-                                
-                                time_str = None
-                                if time_col and not pd.isna(row[time_col]):
-                                    time_str = str(row[time_col]).strip()
-                                
-                                # Parse and format as ISO 8601
-                                parsed_dt = parse_datetime(date_str, time_str)
-                                if parsed_dt:
-                                    quake["datetime"] = parsed_dt
-                                else:
-                                    # Fallback: try to create ISO format manually
-                                    try:
-                                        if time_str:
-                                            quake["datetime"] = f"{date_str}T{time_str}"
-                                        else:
-                                            quake["datetime"] = f"{date_str}T00:00:00"
-                                    except:
-                                        pass
-                            
-                            # Latitude
-                            if 'lat' in col_lower and 'lon' not in col_lower:
-                                try:
-                                    quake["lat"] = float(col_value)
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            # Longitude
-                            if ('lon' in col_lower or 'long' in col_lower) and 'lat' not in col_lower:
-                                try:
-                                    quake["lon"] = float(col_value)
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            # Depth
-                            if 'depth' in col_lower:
-                                try:
-                                    quake["depth"] = float(col_value)
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            # Magnitude
-                            if 'magnitude' in col_lower or 'mag' in col_lower:
-                                try:
-                                    quake["magnitude"] = float(col_value)
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            # Location
-                            if 'location' in col_lower or 'place' in col_lower or 'area' in col_lower:
-                                quake["location"] = str(col_value).strip() if not pd.isna(col_value) else "Unknown location"
-                        
-                        # Only add if we have essential data and valid datetime
-                        if (quake["datetime"] and 
-                            quake["lat"] is not None and 
-                            quake["lon"] is not None):
-                            # Validate datetime can be parsed
-                            try:
-                                # Try multiple datetime parsing methods
-                                test_date = None
-                                try:
-                                    test_date = datetime.fromisoformat(quake["datetime"].replace('Z', '+00:00'))
-                                except:
-                                    try:
-                                        test_date = datetime.strptime(quake["datetime"], "%Y-%m-%dT%H:%M:%S")
-                                    except:
-                                        try:
-                                            test_date = datetime.strptime(quake["datetime"], "%Y-%m-%d %H:%M:%S")
-                                        except:
-                                            # Last resort: try parsing with dateutil if available
-                                            if HAS_DATEUTIL:
-                                                test_date = date_parser.parse(quake["datetime"])
-                                
-                                if test_date and not pd.isna(pd.Timestamp(test_date)):
-                                    # Additional validation: check if date matches the month/year we're processing
-                                    # This ensures we only include earthquakes from the requested month/year
-                                    quake_month = test_date.month
-                                    quake_year = test_date.year
-                                    
-                                    if quake_month == month and quake_year == year:
-                                        month_quakes.append(quake)
-                                    else:
-                                        # Log mismatches for debugging (only first few)
-                                        if months_fetched == 1 and len(month_quakes) < 3:
-                                            print(f"  ⚠️  Date mismatch: quake date {quake_year}-{quake_month:02d} != requested {year}-{month:02d}", file=sys.stderr)
-                                    # else: skip this quake as it's not in the requested month/year
-                            except Exception as date_err:
-                                # Skip invalid datetime
-                                if months_fetched == 1 and len(month_quakes) < 5:
-                                    print(f"  ⚠️  Skipped invalid datetime '{quake['datetime']}': {date_err}", file=sys.stderr)
-                                pass
-                    
-                    all_quakes.extend(month_quakes)
-                    print(f"  ✅ {year}-{month:02d}: Found {len(month_quakes)} earthquakes", file=sys.stderr)
-                else:
-                    print(f"  ⚠️  {year}-{month:02d}: No data available", file=sys.stderr)
-                
-            except Exception as e:
-                # Continue to next month if this one fails
-                print(f"  ❌ Error fetching {year}-{month:02d}: {str(e)}", file=sys.stderr)
-                continue
+    def fetch_task(indexed_task):
+        index, (year, month) = indexed_task
+        print(f"Fetching {year}-{month:02d} ({index + 1}/{total_months})...", file=sys.stderr)
+        return fetch_one_month(year, month, show_sample=(index == 0))
+    
+    # Months are independent and the work is dominated by waiting on
+    # PHIVOLCS, so fetch them concurrently on threads
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        monthly = [
+            quakes for quakes in executor.map(fetch_task, enumerate(tasks))
+            if quakes is not None and not quakes.empty
+        ]
+    
+    if not monthly:
+        return []
+    
+    all_quakes = pd.concat(monthly, ignore_index=True)
     
-    return all_quakes
+    # The same quake can be listed twice (e.g. the main page and the monthly
+    # archive overlap), so drop repeats of the same time and place
+    all_quakes = all_quakes.drop_duplicates(subset=["datetime", "lat", "lon"], keep="first")
+    
+    # Sort by datetime (most recent first) on the datetime64 column, before
+    # the values are turned into strings
+    all_quakes = all_quakes.sort_values("datetime", ascending=False, kind="stable")
+    
+    return quakes_to_records(all_quakes)
 
 def main():
     """Main entry point for the script."""
@@ -341,9 +720,6 @@ def main():
         
         quakes = fetch_earthquakes(years_back, target_month, target_year)
         
-        # Sort by datetime (most recent first)
-        quakes.sort(key=lambda x: x.get("datetime", ""), reverse=True)
-        
         # Output as JSON
         print(json.dumps({"quakes": quakes}, indent=2))
         